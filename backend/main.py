@@ -5,11 +5,15 @@ Main application entry point with Azure OpenAI integration
 
 import os
 import sys
+import json
+import time
+import hashlib
 from pathlib import Path
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 import uvicorn
 from typing import Optional, Dict, Any
@@ -20,7 +24,7 @@ from datetime import datetime
 sys.path.append(str(Path(__file__).parent.parent))
 
 from chatbot.core import DesignThinkingCoach
-from chatbot.config_manager import ConfigManager
+from chatbot.config_manager import get_config_manager
 from chatbot.utils import setup_logging
 
 # Configure logging
@@ -31,7 +35,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Design Thinking Coach API",
     description="AI-powered Design Thinking Coach using Azure OpenAI",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware for frontend integration
@@ -43,8 +48,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses such as session histories
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Initialize the Config Manager
-config_manager = ConfigManager()
+config_manager = get_config_manager()
 
 # Initialize the Design Thinking Coach
 coach = DesignThinkingCoach()
@@ -64,17 +72,49 @@ async def startup_event():
     """Initialize services on startup"""
     # Force reload config at startup to ensure we have the latest
     config_manager.reload_config()
+    
+    # Read the frontend once - it is the most requested page
+    frontend_path = Path(__file__).parent.parent / "frontend" / "index.html"
+    if frontend_path.exists():
+        app.state.index_bytes = frontend_path.read_bytes()
+        # Weak ETag: GZipMiddleware serves the page both compressed and uncompressed
+        app.state.index_etag = f'W/"{hashlib.md5(app.state.index_bytes).hexdigest()}"'
+    else:
+        app.state.index_bytes = None
+        app.state.index_etag = None
+    
     logger.info("🚀 Design Thinking Coach API started successfully!")
     logger.info("📡 Azure OpenAI connection established")
     logger.info("🌐 Frontend will be served from /")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush pending work before shutdown"""
+    await coach.close()
+    logger.info("👋 Design Thinking Coach API stopped")
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, lists and "*" allowed)"""
+    if not if_none_match:
+        return False
+    opaque_tag = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque_tag:
+            return True
+    return False
+
 @app.get("/", response_class=HTMLResponse)
-async def serve_frontend():
-    """Serve the main frontend HTML"""
-    frontend_path = Path(__file__).parent.parent / "frontend" / "index.html"
-    if frontend_path.exists():
-        return FileResponse(frontend_path)
+async def serve_frontend(request: Request):
+    """Serve the main frontend HTML (cached in memory at startup)"""
+    index_bytes = getattr(request.app.state, "index_bytes", None)
+    if index_bytes is not None:
+        headers = {"ETag": request.app.state.index_etag, "Cache-Control": "public, max-age=60"}
+        if _etag_matches(request.headers.get("if-none-match"), request.app.state.index_etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=index_bytes, media_type="text/html", headers=headers)
     else:
+        frontend_path = Path(__file__).parent.parent / "frontend" / "index.html"
         return HTMLResponse("""
         <html>
             <head><title>Design Thinking Coach</title></head>
@@ -103,31 +143,63 @@ async def chat_endpoint(chat_message: ChatMessage):
         ChatResponse with bot reply, session info, and usage statistics
     """
     try:
-        logger.info(f"💬 Received message: '{chat_message.message[:50]}...' from session: {chat_message.session_id}")
+        logger.info("💬 Received message: '%.50s...' from session: %s", chat_message.message, chat_message.session_id)
         
         # Use the correct method name and await the async call
         response = await coach.process_message(
             message=chat_message.message,
-            session_id=chat_message.session_id or f"session-{datetime.now().timestamp()}"
+            session_id=chat_message.session_id or f"session-{time.time_ns()}"
         )
         
-        logger.info(f"✅ Generated response for session: {response.get('session_id')}")
+        logger.info("✅ Generated response for session: %s", response.get("session_id"))
         
-        return ChatResponse(
-            reply=response["reply"],
-            session_id=response["session_id"],
-            usage=response.get("usage"),
-            error=None
-        )
+        # Plain dict - FastAPI validates it once against response_model
+        return {
+            "reply": response["reply"],
+            "session_id": response["session_id"],
+            "usage": response.get("usage"),
+            "error": None
+        }
         
     except Exception as e:
-        logger.error(f"❌ Chat endpoint error: {str(e)}")
-        return ChatResponse(
-            reply="Entschuldigung, es gab einen technischen Fehler. Bitte versuchen Sie es erneut.",
-            session_id=chat_message.session_id or "error",
-            usage=None,
-            error=str(e)
-        )
+        logger.error("❌ Chat endpoint error: %s", e)
+        return {
+            "reply": "Entschuldigung, es gab einen technischen Fehler. Bitte versuchen Sie es erneut.",
+            "session_id": chat_message.session_id or "error",
+            "usage": None,
+            "error": str(e)
+        }
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(chat_message: ChatMessage):
+    """
+    Streaming chat endpoint using Server-Sent Events
+    
+    Args:
+        chat_message: User message and optional session ID
+        
+    Returns:
+        StreamingResponse emitting `delta` events followed by a final `done` event
+    """
+    session_id = chat_message.session_id or f"session-{time.time_ns()}"
+    logger.info("💬 Received streaming message: '%.50s...' from session: %s", chat_message.message, session_id)
+    
+    async def event_stream():
+        try:
+            async for delta in coach.stream_message(message=chat_message.message, session_id=session_id):
+                yield f"data: {json.dumps({'delta': delta}, ensure_ascii=False)}\n\n"
+            yield f"data: {json.dumps({'done': True, 'session_id': session_id})}\n\n"
+            logger.info("✅ Streamed response for session: %s", session_id)
+        except Exception as e:
+            logger.error("❌ Chat stream error: %s", e)
+            yield f"data: {json.dumps({'done': True, 'session_id': session_id, 'error': str(e)}, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Identity encoding keeps GZipMiddleware from buffering the event stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "Content-Encoding": "identity"}
+    )
 
 @app.get("/api/sessions")
 async def get_sessions():
@@ -136,21 +208,28 @@ async def get_sessions():
         sessions = coach.list_sessions()
         return {"sessions": sessions}
     except Exception as e:
-        logger.error(f"❌ Sessions endpoint error: {str(e)}")
+        logger.error("❌ Sessions endpoint error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/sessions/{session_id}")
 async def get_session(session_id: str):
-    """Get specific chat session history"""
+    """
+    Get specific chat session history
+    
+    Returns the full saved history (rebuilt from the conversation JSONL files), also
+    for sessions already evicted from memory. Resetting a session only clears the
+    coach's context; its saved history is kept. With save_conversations disabled only
+    the last 20 messages of sessions still in memory are available.
+    """
     try:
-        session = coach.sessions.get(session_id, [])
-        if not session:
+        messages = await coach.get_session_history(session_id)
+        if messages is None:
             raise HTTPException(status_code=404, detail="Session not found")
-        return {"session_id": session_id, "messages": session}
+        return {"session_id": session_id, "messages": messages}
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"❌ Session detail error: {str(e)}")
+        logger.error("❌ Session detail error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/sessions/{session_id}")
@@ -160,7 +239,7 @@ async def reset_session(session_id: str):
         coach.clear_session(session_id)
         return {"message": f"Session {session_id} reset successfully"}
     except Exception as e:
-        logger.error(f"❌ Session reset error: {str(e)}")
+        logger.error("❌ Session reset error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/health")
@@ -179,7 +258,7 @@ async def get_config():
     try:
         # Debug: Explicitly log the framework section being retrieved
         framework_config = config_manager.get_config("framework")
-        logger.info(f"API endpoint retrieved framework config: {framework_config}")
+        logger.info("API endpoint retrieved framework config: %s", framework_config)
         
         config = {
             "application": config_manager.get_config("application"),
@@ -197,11 +276,12 @@ async def get_config():
         }
         
         # Debug: Log the final response structure
-        logger.info(f"API response contains framework keys: {list(config['framework'].keys()) if isinstance(config['framework'], dict) else 'Not a dict'}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("API response contains framework keys: %s", list(config['framework'].keys()) if isinstance(config['framework'], dict) else 'Not a dict')
         
         return {"config": config}
     except Exception as e:
-        logger.error(f"❌ Config endpoint error: {str(e)}")
+        logger.error("❌ Config endpoint error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/config/reload")
@@ -214,18 +294,25 @@ async def reload_config():
         logger.info("🔄 Configuration reloaded successfully")
         return {"status": "success", "message": "Configuration reloaded"}
     except Exception as e:
-        logger.error(f"❌ Config reload error: {str(e)}")
+        logger.error("❌ Config reload error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     # Get server config from config manager
     server_config = config_manager.get_server_config()
+    workers = server_config.get("workers", 1)
     
     # For development - run with: python main.py
+    # Sessions are kept in memory per worker process, so with workers > 1 the
+    # reverse proxy must route each session_id to the same worker
     uvicorn.run(
         "main:app",
         host=server_config.get("host", "0.0.0.0"),
         port=server_config.get("port", 8000),
-        reload=server_config.get("reload", True),
-        log_level=server_config.get("log_level", "info")
+        reload=server_config.get("reload", True) and workers == 1,
+        workers=workers,
+        log_level=server_config.get("log_level", "info"),
+        loop=server_config.get("loop", "auto"),
+        http=server_config.get("http", "auto"),
+        interface="asgi3"
     )
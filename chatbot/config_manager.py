@@ -6,7 +6,7 @@ Central module for loading and managing application configuration
 import os
 import logging
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 
 from chatbot.utils import load_yaml
@@ -18,39 +18,89 @@ logger = logging.getLogger(__name__)
 
 class ConfigManager:
     """
-    Singleton class for managing configuration across the application
+    Class for managing configuration across the application
+    
+    Use get_config_manager() to access the shared instance.
     """
-    _instance = None
-    _config = None
 
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(ConfigManager, cls).__new__(cls)
-            cls._instance._load_config()
-        return cls._instance
+    def __init__(self):
+        self._config: Dict[str, Any] = {}
+        self._model_config: Dict[str, Any] = {}
+        self._server_config: Dict[str, Any] = {}
+        self._config_stat: Optional[Tuple[int, int]] = None
+        self._load_config()
 
-    def _load_config(self):
-        """Load the master configuration file"""
+    def _get_config_path(self) -> Path:
+        """Get the absolute path of the master configuration file"""
         # Get the absolute path to the project root directory
         project_root = Path(__file__).parent.parent
         config_rel_path = os.getenv("CONFIG_PATH", "config/master_config.yaml")
-        config_abs_path = project_root / config_rel_path
+        return project_root / config_rel_path
+
+    def _stat_config_file(self) -> Optional[Tuple[int, int]]:
+        """Get (mtime_ns, size) of the master configuration file, or None if it is missing"""
+        try:
+            st = os.stat(self._get_config_path())
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load_config(self):
+        """Load the master configuration file"""
+        config_abs_path = self._get_config_path()
         
-        logger.info(f"Loading config from absolute path: {config_abs_path}")
+        logger.info("Loading config from absolute path: %s", config_abs_path)
         try:
+            config_stat = self._stat_config_file()
             self._config = load_yaml(str(config_abs_path))
-            logger.info(f"Master configuration loaded from {config_abs_path}")
+            self._config_stat = config_stat
+            logger.info("Master configuration loaded from %s", config_abs_path)
             # Debug: Log the actual keys to verify structure
-            logger.info(f"Config has {len(self._config)} top-level keys: {list(self._config.keys())}")
+            logger.info("Config has %d top-level keys: %s", len(self._config), list(self._config.keys()))
             if 'framework' in self._config:
-                logger.info(f"Framework section found with keys: {list(self._config['framework'].keys())}")
+                logger.info("Framework section found with keys: %s", list(self._config['framework'].keys()))
             else:
                 logger.warning("No 'framework' section found in loaded config!")
         except Exception as e:
-            logger.error(f"Failed to load master config: {e}")
+            logger.error("Failed to load master config: %s", e)
             self._config = self._get_fallback_config()
+            self._config_stat = None
             logger.warning("Using fallback configuration")
 
+        self._apply_env_overrides()
+
+    def _apply_env_overrides(self):
+        """Build model and server configuration with environment variable overrides applied"""
+        model_config = dict(self._config.get("model", {}))
+        
+        # Override with environment variables if present
+        if os.getenv("DEPLOYMENT_NAME"):
+            model_config["deployment_name"] = os.getenv("DEPLOYMENT_NAME")
+            
+        if os.getenv("ENDPOINT_URL"):
+            model_config["endpoint_url"] = os.getenv("ENDPOINT_URL")
+            
+        if os.getenv("MOCK_RESPONSES", "").lower() in ("true", "1", "yes"):
+            model_config["mock_responses"] = True
+        
+        server_config = dict(self._config.get("server", {}))
+        
+        if os.getenv("PORT"):
+            server_config["port"] = int(os.getenv("PORT"))
+            
+        if os.getenv("HOST"):
+            server_config["host"] = os.getenv("HOST")
+            
+        if os.getenv("WORKERS"):
+            server_config["workers"] = int(os.getenv("WORKERS"))
+        
+        # Auto-reload only works with a single worker; otherwise use the available cores
+        if "workers" not in server_config:
+            server_config["workers"] = 1 if server_config.get("reload", True) else max(2, os.cpu_count() or 1)
+        
+        self._model_config = model_config
+        self._server_config = server_config
+
     def _get_fallback_config(self) -> Dict[str, Any]:
         """Provide fallback configuration if master config file is missing"""
         return {
@@ -88,37 +138,31 @@ class ConfigManager:
         Returns:
             Full config dict or section dict
         """
-        # Debug logging to see what's happening with the config
-        logger.info(f"Config keys: {list(self._config.keys())}")
+        # Debug logging to see what's happening with the config (this runs on every request)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Config keys: %s", list(self._config.keys()))
         if section:
             if section in self._config:
-                logger.info(f"Section '{section}' found in config, keys: {list(self._config[section].keys()) if isinstance(self._config[section], dict) else 'Not a dict'}")
+                if debug:
+                    logger.debug("Section '%s' found in config, keys: %s", section, list(self._config[section].keys()) if isinstance(self._config[section], dict) else 'Not a dict')
                 return self._config[section]
             else:
-                logger.warning(f"Section '{section}' not found in config, returning empty dict")
+                logger.warning("Section '%s' not found in config, returning empty dict", section)
                 return {}
         return self._config
 
     def reload_config(self):
-        """Force reload of configuration"""
+        """Reload configuration, skipping the parse if the file is unchanged since the last load"""
+        if self._config_stat is not None and self._config_stat == self._stat_config_file():
+            logger.info("Configuration file unchanged - skipping reload")
+            return
         self._load_config()
         logger.info("Configuration reloaded")
 
     def get_model_config(self) -> Dict[str, Any]:
         """Get model-specific configuration with environment variable overrides"""
-        model_config = self.get_config("model")
-        
-        # Override with environment variables if present
-        if os.getenv("DEPLOYMENT_NAME"):
-            model_config["deployment_name"] = os.getenv("DEPLOYMENT_NAME")
-            
-        if os.getenv("ENDPOINT_URL"):
-            model_config["endpoint_url"] = os.getenv("ENDPOINT_URL")
-            
-        if os.getenv("MOCK_RESPONSES", "").lower() in ("true", "1", "yes"):
-            model_config["mock_responses"] = True
-            
-        return model_config
+        return self._model_config
 
     def get_prompt_config(self) -> Dict[str, Any]:
         """Get prompt-specific configuration"""
@@ -130,13 +174,19 @@ class ConfigManager:
         
     def get_server_config(self) -> Dict[str, Any]:
         """Get server configuration with environment variable overrides"""
-        server_config = self.get_config("server")
-        
-        # Override with environment variables if present
-        if os.getenv("PORT"):
-            server_config["port"] = int(os.getenv("PORT"))
-            
-        if os.getenv("HOST"):
-            server_config["host"] = os.getenv("HOST")
-            
-        return server_config
+        return self._server_config
+
+
+_CONFIG_MANAGER: Optional[ConfigManager] = None
+
+def get_config_manager() -> ConfigManager:
+    """
+    Get the shared ConfigManager instance, creating it on first use
+    
+    Returns:
+        The application-wide ConfigManager
+    """
+    global _CONFIG_MANAGER
+    if _CONFIG_MANAGER is None:
+        _CONFIG_MANAGER = ConfigManager()
+    return _CONFIG_MANAGER
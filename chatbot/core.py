@@ -5,23 +5,43 @@ Hauptklasse für die Chat-Logik und Integration mit Azure OpenAI
 
 import os
 import json
+import asyncio
+import hashlib
+import importlib.util
+import random
+import time
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 from pathlib import Path
 import logging
+from collections import OrderedDict, deque
 
-from openai import AzureOpenAI
+import httpx
+from openai import AsyncAzureOpenAI, APIConnectionError, APIStatusError
 from dotenv import load_dotenv
 
 from .prompt_engine import PromptEngine
-from .utils import save_json, load_json
-from .config_manager import ConfigManager
+from .utils import append_jsonl, load_jsonl
+from .config_manager import get_config_manager
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Number of messages kept per session (10 exchanges) - also the history window sent to the model
+MAX_SESSION_MESSAGES = 20
+
+# Retry policy for transient Azure OpenAI errors (rate limits, dropped connections, 408/409/5xx)
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+# Cache of replies for identical conversation contexts (only used for near-deterministic sampling)
+REPLY_CACHE_SIZE = 512
+REPLY_CACHE_TTL = 300.0
+REPLY_CACHE_MAX_TEMPERATURE = 0.3
+
 class DesignThinkingCoach:
     """
     Main class for the Design Thinking Coach chatbot
@@ -32,12 +52,19 @@ class DesignThinkingCoach:
         """
         Initialize the Design Thinking Coach
         """
-        self.config_manager = ConfigManager()
+        self.config_manager = get_config_manager()
         self.config = self.config_manager.get_config()
         self.model_config = self.config_manager.get_model_config()
+        self._chat_kwargs = self._build_chat_kwargs()
+        self._reply_cache: "OrderedDict[bytes, Tuple[float, str, Optional[Dict]]]" = OrderedDict()
         self.prompt_engine = PromptEngine()
         self.client = self._init_azure_client()
-        self.sessions: Dict[str, List[Dict]] = {}
+        self.sessions: "OrderedDict[str, deque]" = OrderedDict()
+        self.max_sessions = self.config_manager.get_config("application").get("max_sessions", 1000)
+        
+        # Conversation snapshots are written by a single background worker, off the request path
+        self._save_queue: Optional[asyncio.Queue] = None
+        self._save_worker: Optional[asyncio.Task] = None
         
         # Create conversations directory if it doesn't exist
         self.conversations_dir = Path("backend/conversations")
@@ -50,8 +77,23 @@ class DesignThinkingCoach:
         self.config_manager.reload_config()
         self.config = self.config_manager.get_config()
         self.model_config = self.config_manager.get_model_config()
+        self._chat_kwargs = self._build_chat_kwargs()
+        self._reply_cache.clear()
+        self.max_sessions = self.config_manager.get_config("application").get("max_sessions", 1000)
+        self._evict_sessions()
     
-    def _init_azure_client(self) -> Optional[AzureOpenAI]:
+    def _build_chat_kwargs(self) -> Dict[str, Any]:
+        """Resolve the chat completion parameters from the model configuration"""
+        return {
+            "model": self.model_config.get("deployment_name", "gpt-4.1-mini"),
+            "max_tokens": self.model_config.get("max_tokens", 1000),
+            "temperature": self.model_config.get("temperature", 0.3),
+            "top_p": self.model_config.get("top_p", 0.95),
+            "frequency_penalty": self.model_config.get("frequency_penalty", 0),
+            "presence_penalty": self.model_config.get("presence_penalty", 0)
+        }
+    
+    def _init_azure_client(self) -> Optional[AsyncAzureOpenAI]:
         """
         Initialize Azure OpenAI client using configuration from the config manager
         """
@@ -69,17 +111,31 @@ class DesignThinkingCoach:
                 logger.warning("AZURE_OPENAI_API_KEY environment variable is not set")
                 return None
             
-            client = AzureOpenAI(
+            # HTTP/2 needs the optional h2 package (httpx[http2]); without it httpx raises ImportError
+            http2 = importlib.util.find_spec("h2") is not None
+            if not http2:
+                logger.warning("h2 package not installed - using HTTP/1.1 for Azure OpenAI (install httpx[http2])")
+            
+            # Shared connection pool so concurrent requests reuse TLS connections (multiplexed over HTTP/2)
+            http_client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=30),
+                timeout=httpx.Timeout(60.0, connect=5.0)
+            )
+            
+            client = AsyncAzureOpenAI(
                 azure_endpoint=endpoint,
                 api_key=api_key,
-                api_version=self.model_config.get("api_version", "2025-01-01-preview")
+                api_version=self.model_config.get("api_version", "2025-01-01-preview"),
+                max_retries=0,  # Retries are handled by _create_completion
+                http_client=http_client
             )
             
-            logger.info(f"Azure OpenAI client initialized with endpoint: {endpoint}")
+            logger.info("Azure OpenAI client initialized with endpoint: %s", endpoint)
             return client
             
         except Exception as e:
-            logger.error(f"Failed to initialize Azure OpenAI client: {e}")
+            logger.error("Failed to initialize Azure OpenAI client: %s", e)
             return None
     
     async def process_message(self, message: str, session_id: str = "default") -> Dict[str, Any]:
@@ -94,34 +150,27 @@ class DesignThinkingCoach:
             Dict containing reply, usage info, and metadata
         """
         try:
+            now = datetime.now()
+            timestamp = now.isoformat()
+            
             # Get or create session
-            if session_id not in self.sessions:
-                self.sessions[session_id] = []
+            session = self._get_session(session_id)
             
             # Add user message to session
             user_message = {
                 "role": "user",
                 "content": message,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": timestamp
             }
-            self.sessions[session_id].append(user_message)
+            session.append(user_message)
             
             # Build conversation context
-            messages = self._build_conversation_context(session_id)
-            
-            # Get model configuration
-            model_name = self.model_config.get("deployment_name", "gpt-4.1-mini")
+            messages = self._build_conversation_context(session)
             
             # Check if we're in mock mode or client is not initialized
             if self.model_config.get("mock_responses", False) or self.client is None:
                 logger.info("Using mock response mode")
-                # Generate a simple mock response
-                if "problem" in message.lower():
-                    reply = "Das klingt nach einem spannenden Problem! Lassen Sie uns das systematisch angehen. Zuerst sollten wir ein klares **Problem Statement** formulieren."
-                elif "idee" in message.lower():
-                    reply = "Interessante Idee! Lassen Sie uns diese mit dem **How-Might-We** Ansatz weiterentwickeln."
-                else:
-                    reply = "Danke für Ihre Nachricht. Als Design Thinking Coach helfe ich Ihnen gerne weiter. Was beschäftigt Sie heute?"
+                reply = self._get_mock_reply(message)
                 
                 # Simulate usage
                 usage = {
@@ -130,25 +179,24 @@ class DesignThinkingCoach:
                     "total_tokens": 250
                 }
             else:
-                # Call Azure OpenAI
-                logger.info(f"Sending request to Azure OpenAI model: {model_name}")
-                completion = self.client.chat.completions.create(
-                    model=model_name,
-                    messages=messages,
-                    max_tokens=self.model_config.get("max_tokens", 1000),
-                    temperature=self.model_config.get("temperature", 0.3),
-                    top_p=self.model_config.get("top_p", 0.95),
-                    frequency_penalty=self.model_config.get("frequency_penalty", 0),
-                    presence_penalty=self.model_config.get("presence_penalty", 0),
-                    stream=False
-                )
-                # Extract response from completion
-                reply = completion.choices[0].message.content
-                usage = {
-                    "prompt_tokens": completion.usage.prompt_tokens,
-                    "completion_tokens": completion.usage.completion_tokens,
-                    "total_tokens": completion.usage.total_tokens
-                } if completion.usage else None
+                cache_key = self._get_reply_cache_key(messages)
+                cached = self._get_cached_reply(cache_key) if cache_key else None
+                if cached:
+                    logger.info("Serving reply from cache")
+                    reply, usage = cached
+                else:
+                    # Call Azure OpenAI
+                    logger.info("Sending request to Azure OpenAI model: %s", self._chat_kwargs["model"])
+                    completion = await self._create_completion(messages, stream=False)
+                    # Extract response from completion
+                    reply = completion.choices[0].message.content
+                    usage = {
+                        "prompt_tokens": completion.usage.prompt_tokens,
+                        "completion_tokens": completion.usage.completion_tokens,
+                        "total_tokens": completion.usage.total_tokens
+                    } if completion.usage else None
+                    if cache_key:
+                        self._cache_reply(cache_key, reply, usage)
             
             # Variable 'reply' and 'usage' are already set in the previous block
             
@@ -156,61 +204,237 @@ class DesignThinkingCoach:
             assistant_message = {
                 "role": "assistant",
                 "content": reply,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": timestamp
             }
-            self.sessions[session_id].append(assistant_message)
+            session.append(assistant_message)
             
             # Save conversation if enabled
             app_config = self.config_manager.get_config("application")
             if app_config.get("save_conversations", True):
-                self._save_conversation(session_id)
+                self._schedule_save(session_id, [user_message, assistant_message], now)
             
-            logger.info(f"Successfully processed message for session {session_id}")
+            logger.info("Successfully processed message for session %s", session_id)
             
             return {
                 "reply": reply,
                 "usage": usage,
                 "session_id": session_id,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": timestamp
             }
             
         except Exception as e:
-            logger.error(f"Error processing message: {e}")
+            logger.error("Error processing message: %s", e)
             raise
     
-    def _build_conversation_context(self, session_id: str) -> List[Dict[str, str]]:
+    async def stream_message(self, message: str, session_id: str = "default") -> AsyncIterator[str]:
         """
-        Build the full conversation context including system prompt and history
+        Process a user message and stream the coach's response as it is generated
         
         Args:
-            session_id: Session identifier
+            message: User's input message
+            session_id: Session identifier for conversation tracking
+            
+        Yields:
+            Text fragments of the reply in generation order
+        """
+        try:
+            now = datetime.now()
+            timestamp = now.isoformat()
+            
+            # Get or create session
+            session = self._get_session(session_id)
+            
+            # Add user message to session
+            user_message = {
+                "role": "user",
+                "content": message,
+                "timestamp": timestamp
+            }
+            session.append(user_message)
+            
+            # Build conversation context
+            messages = self._build_conversation_context(session)
+            
+            reply_parts: List[str] = []
+            
+            # Check if we're in mock mode or client is not initialized
+            if self.model_config.get("mock_responses", False) or self.client is None:
+                logger.info("Using mock response mode")
+                reply = self._get_mock_reply(message)
+                reply_parts.append(reply)
+                yield reply
+            else:
+                # Call Azure OpenAI with streaming enabled
+                logger.info("Streaming request to Azure OpenAI model: %s", self._chat_kwargs["model"])
+                completion = await self._create_completion(messages, stream=True)
+                async for chunk in completion:
+                    # Azure sends content-filter chunks without choices
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        reply_parts.append(delta)
+                        yield delta
+            
+            # Add the complete assistant response to session once the stream is finished
+            assistant_message = {
+                "role": "assistant",
+                "content": "".join(reply_parts),
+                "timestamp": timestamp
+            }
+            session.append(assistant_message)
+            
+            # Save conversation if enabled
+            app_config = self.config_manager.get_config("application")
+            if app_config.get("save_conversations", True):
+                self._schedule_save(session_id, [user_message, assistant_message], now)
+            
+            logger.info("Successfully streamed message for session %s", session_id)
+            
+        except Exception as e:
+            logger.error("Error streaming message: %s", e)
+            raise
+    
+    async def _create_completion(self, messages: List[Dict[str, str]], stream: bool):
+        """
+        Call the Azure OpenAI chat completion API, retrying transient errors
+        
+        Rate limit, connection, timeout (408), conflict (409) and server (5xx)
+        errors are retried with exponential backoff and jitter, honouring the
+        Retry-After header when Azure sends one.
+        
+        Args:
+            messages: Conversation context for the model
+            stream: Whether to request a streamed completion
             
         Returns:
-            List of message dictionaries for OpenAI API
+            Chat completion, or an async stream of completion chunks
         """
-        messages = []
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return await self.client.chat.completions.create(
+                    messages=messages,
+                    stream=stream,
+                    **self._chat_kwargs
+                )
+            except (APIConnectionError, APIStatusError) as e:
+                if attempt == MAX_RETRIES or not self._is_retryable(e):
+                    raise
+                delay = self._get_retry_delay(e, attempt)
+                logger.warning("Azure OpenAI request failed (%s), retrying in %.1fs (attempt %d/%d)",
+                               type(e).__name__, delay, attempt + 1, MAX_RETRIES)
+                await asyncio.sleep(delay)
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Check whether a failed request is worth retrying (same status codes as the SDK's own retries)"""
+        if isinstance(error, APIStatusError):
+            return error.status_code in (408, 409, 429) or error.status_code >= 500
+        return True
+    
+    def _get_retry_delay(self, error: Exception, attempt: int) -> float:
+        """Get the wait time before the next retry from Retry-After or exponential backoff"""
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return min(float(retry_after), RETRY_MAX_DELAY)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+    
+    def _get_reply_cache_key(self, messages: List[Dict[str, str]]) -> Optional[bytes]:
+        """
+        Hash the conversation context into a reply cache key
         
-        # Add system prompt
-        system_prompt = self.prompt_engine.get_system_prompt()
-        if system_prompt:
-            messages.append({
-                "role": "system",
-                "content": system_prompt
-            })
+        Returns:
+            Cache key, or None if the sampling temperature is too high for replies to be reused
+        """
+        if self._chat_kwargs["temperature"] > REPLY_CACHE_MAX_TEMPERATURE:
+            return None
+        payload = json.dumps(messages, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return hashlib.blake2b(payload, digest_size=16).digest()
+    
+    def _get_cached_reply(self, cache_key: bytes) -> Optional[Tuple[str, Optional[Dict]]]:
+        """Get a cached (reply, usage) pair if it has not expired"""
+        entry = self._reply_cache.get(cache_key)
+        if entry is None:
+            return None
+        cached_at, reply, usage = entry
+        if time.monotonic() - cached_at > REPLY_CACHE_TTL:
+            del self._reply_cache[cache_key]
+            return None
+        self._reply_cache.move_to_end(cache_key)
+        return reply, usage
+    
+    def _cache_reply(self, cache_key: bytes, reply: str, usage: Optional[Dict]):
+        """Store a reply in the cache, evicting the least recently used entries"""
+        self._reply_cache[cache_key] = (time.monotonic(), reply, usage)
+        self._reply_cache.move_to_end(cache_key)
+        while len(self._reply_cache) > REPLY_CACHE_SIZE:
+            self._reply_cache.popitem(last=False)
+    
+    def _get_mock_reply(self, message: str) -> str:
+        """
+        Generate a simple mock response for development without Azure OpenAI
         
-        # Add few-shot examples
-        examples = self.prompt_engine.get_few_shot_examples()
-        if examples:
-            messages.append({
-                "role": "system",
-                "content": f"Hier sind Beispiele für gute Gespräche:\n\n{examples}"
-            })
+        Args:
+            message: User's input message
+            
+        Returns:
+            Mock reply text
+        """
+        if "problem" in message.lower():
+            return "Das klingt nach einem spannenden Problem! Lassen Sie uns das systematisch angehen. Zuerst sollten wir ein klares **Problem Statement** formulieren."
+        elif "idee" in message.lower():
+            return "Interessante Idee! Lassen Sie uns diese mit dem **How-Might-We** Ansatz weiterentwickeln."
+        return "Danke für Ihre Nachricht. Als Design Thinking Coach helfe ich Ihnen gerne weiter. Was beschäftigt Sie heute?"
+    
+    async def close(self):
+        """Flush pending conversation saves and close the Azure OpenAI connection pool"""
+        await self.flush_conversations()
+        if self.client is not None:
+            await self.client.close()
+    
+    def _get_session(self, session_id: str) -> deque:
+        """
+        Get or create a session and mark it as most recently used
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            Message deque of the session
+        """
+        session = self.sessions.get(session_id)
+        if session is None:
+            session = self.sessions[session_id] = deque(maxlen=MAX_SESSION_MESSAGES)
+            self._evict_sessions()
+        else:
+            self.sessions.move_to_end(session_id)
+        return session
+    
+    def _evict_sessions(self):
+        """Evict least recently used sessions beyond max_sessions (messages are already persisted per turn)"""
+        while len(self.sessions) > self.max_sessions:
+            evicted_id, _ = self.sessions.popitem(last=False)
+            logger.info("Session %s evicted from memory", evicted_id)
+    
+    def _build_conversation_context(self, session: deque) -> List[Dict[str, str]]:
+        """
+        Build the full conversation context including system prompt and history
         
-        # Add conversation history (limit to last 10 exchanges to manage token count)
-        session_messages = self.sessions.get(session_id, [])
-        recent_messages = session_messages[-20:]  # Last 20 messages (10 exchanges)
+        Args:
+            session: Message deque of the session
+            
+        Returns:
+            List of message dictionaries for OpenAI API
+        """
+        # Start from the cached system prompt and few-shot examples
+        messages = list(self.prompt_engine.get_prefix_messages())
         
-        for msg in recent_messages:
+        # Add conversation history (the session deque already holds only the last 10 exchanges)
+        for msg in session:
             messages.append({
                 "role": msg["role"],
                 "content": msg["content"]
@@ -218,19 +442,97 @@ class DesignThinkingCoach:
         
         return messages
     
-    def _save_conversation(self, session_id: str):
-        """Save conversation to file"""
+    def _schedule_save(self, session_id: str, messages: List[Dict], now: Optional[datetime] = None):
+        """
+        Queue new conversation messages for saving by the background worker
+        
+        Falls back to saving synchronously when no event loop is running.
+        
+        Args:
+            session_id: Session identifier
+            messages: Messages added since the last save
+            now: Timestamp of the change
+        """
         try:
-            file_path = self.conversations_dir / f"{session_id}_{datetime.now().strftime('%Y%m%d')}.json"
-            conversation_data = {
-                "session_id": session_id,
-                "messages": self.sessions[session_id],
-                "last_updated": datetime.now().isoformat()
-            }
-            save_json(str(file_path), conversation_data)
-            logger.debug(f"Conversation saved to {file_path}")
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._save_conversation(session_id, messages, now)
+            return
+        
+        if self._save_worker is None or self._save_worker.done():
+            self._save_queue = asyncio.Queue()
+            self._save_worker = asyncio.create_task(self._run_save_worker(self._save_queue))
+        self._save_queue.put_nowait((session_id, messages, now))
+    
+    async def _run_save_worker(self, queue: asyncio.Queue):
+        """Write queued conversation messages in a worker thread, one batch at a time and in order"""
+        while True:
+            session_id, messages, now = await queue.get()
+            try:
+                await asyncio.to_thread(self._save_conversation, session_id, messages, now)
+            finally:
+                queue.task_done()
+    
+    async def flush_conversations(self):
+        """Wait until all queued conversation messages have been written"""
+        if self._save_queue is not None and self._save_worker is not None and not self._save_worker.done():
+            await self._save_queue.join()
+    
+    def _save_conversation(self, session_id: str, messages: List[Dict], now: Optional[datetime] = None):
+        """Append new conversation messages to the session's JSONL file"""
+        try:
+            if now is None:
+                now = datetime.now()
+            file_path = self.conversations_dir / f"{session_id}_{now.strftime('%Y%m%d')}.jsonl"
+            append_jsonl(str(file_path), messages)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Conversation saved to %s", file_path)
         except Exception as e:
-            logger.error(f"Failed to save conversation: {e}")
+            logger.error("Failed to save conversation: %s", e)
+    
+    async def get_session_history(self, session_id: str) -> Optional[List[Dict]]:
+        """
+        Get the full message history of a session
+        
+        The in-memory session only holds the last MAX_SESSION_MESSAGES messages and
+        may have been evicted, so the history is rebuilt from the session's saved
+        JSONL files when there are any.
+        
+        Args:
+            session_id: Session identifier
+            
+        Returns:
+            List of messages, or None if the session is unknown
+        """
+        await self.flush_conversations()
+        file_paths = await asyncio.to_thread(self._find_conversation_files, session_id)
+        if file_paths:
+            return await asyncio.to_thread(self._load_conversation_files, file_paths)
+        
+        # Saving is disabled (or nothing was saved yet) - only the in-memory window is available
+        session = self.sessions.get(session_id)
+        return list(session) if session is not None else None
+    
+    def _find_conversation_files(self, session_id: str) -> List[Path]:
+        """Find the session's daily JSONL files, oldest first"""
+        prefix = f"{session_id}_"
+        file_paths = []
+        with os.scandir(self.conversations_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                # <session_id>_<YYYYMMDD>.jsonl - the date check keeps e.g. "a" from matching "a_b_20250101.jsonl"
+                if name.startswith(prefix) and name.endswith(".jsonl"):
+                    date = name[len(prefix):-len(".jsonl")]
+                    if len(date) == 8 and date.isdigit():
+                        file_paths.append(Path(entry.path))
+        return sorted(file_paths)
+    
+    def _load_conversation_files(self, file_paths: List[Path]) -> List[Dict]:
+        """Read the messages of several JSONL files in order"""
+        messages = []
+        for file_path in file_paths:
+            messages.extend(load_jsonl(str(file_path)))
+        return messages
     
     def get_public_config(self) -> Dict[str, Any]:
         """Get configuration without sensitive information"""
@@ -249,7 +551,7 @@ class DesignThinkingCoach:
         """Clear a specific session"""
         if session_id in self.sessions:
             del self.sessions[session_id]
-            logger.info(f"Session {session_id} cleared")
+            logger.info("Session %s cleared", session_id)
     
     def clear_all_sessions(self):
         """Clear all sessions"""
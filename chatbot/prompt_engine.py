@@ -4,10 +4,10 @@ Handles loading and management of system prompts and few-shot examples
 """
 
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import logging
 
-from .config_manager import ConfigManager
+from .config_manager import get_config_manager
 
 logger = logging.getLogger(__name__)
 
@@ -18,14 +18,15 @@ class PromptEngine:
     
     def __init__(self):
         """
-        Initialize prompt engine with configuration from ConfigManager
+        Initialize prompt engine with configuration from the shared ConfigManager
         """
-        self.config_manager = ConfigManager()
+        self.config_manager = get_config_manager()
         self.prompt_config = self.config_manager.get_prompt_config()
         
         # Cache for loaded prompts
         self._system_prompt_cache = None
         self._few_shot_cache = None
+        self._prefix_messages: Optional[List[Dict[str, str]]] = None
         
         logger.info("Prompt Engine initialized")
     
@@ -57,6 +58,37 @@ class PromptEngine:
         
         return self._few_shot_cache
     
+    def get_prefix_messages(self) -> List[Dict[str, str]]:
+        """
+        Get the system prompt and few-shot examples as chat messages
+        
+        The list is built once and reused for every request until the prompts
+        are reloaded; callers must copy it before appending to it.
+        
+        Returns:
+            List of system message dictionaries for the OpenAI API
+        """
+        if self._prefix_messages is None:
+            prefix_messages = []
+            
+            system_prompt = self.get_system_prompt()
+            if system_prompt:
+                prefix_messages.append({
+                    "role": "system",
+                    "content": system_prompt
+                })
+            
+            examples = self.get_few_shot_examples()
+            if examples:
+                prefix_messages.append({
+                    "role": "system",
+                    "content": f"Hier sind Beispiele für gute Gespräche:\n\n{examples}"
+                })
+            
+            self._prefix_messages = prefix_messages
+        
+        return self._prefix_messages
+    
     def _load_prompt_file(self, file_path: str) -> str:
         """
         Load content from a prompt file
@@ -70,17 +102,18 @@ class PromptEngine:
         try:
             path = Path(file_path)
             if not path.exists():
-                logger.warning(f"Prompt file not found: {file_path}")
+                logger.warning("Prompt file not found: %s", file_path)
                 return ""
             
             with open(path, 'r', encoding='utf-8') as f:
                 content = f.read().strip()
             
-            logger.debug(f"Loaded prompt from {file_path}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Loaded prompt from %s", file_path)
             return content
             
         except Exception as e:
-            logger.error(f"Error loading prompt file {file_path}: {e}")
+            logger.error("Error loading prompt file %s: %s", file_path, e)
             return ""
     
     def reload_prompts(self):
@@ -89,6 +122,7 @@ class PromptEngine:
         """
         self._system_prompt_cache = None
         self._few_shot_cache = None
+        self._prefix_messages = None
         
         # Force config manager to reload
         self.config_manager.reload_config()
@@ -3,25 +3,77 @@ Utility functions for the Design Thinking Coach
 Handles file operations, configuration loading, and logging setup
 """
 
+import contextlib
+import copy
+import functools
+import io
 import json
-import yaml
 import logging
+import logging.handlers
+import math
 import os
+import time
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, List
-from datetime import datetime
+from typing import Dict, Any, Callable, List, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional - fall back to the stdlib json module
+    orjson = None
 
 # Load environment variables
 load_dotenv()
 
+# Environment variables read by this module, captured once after loading .env
+_ENV_VARS = ("AZURE_OPENAI_API_KEY", "ENDPOINT_URL", "DEPLOYMENT_NAME", "MOCK_RESPONSES")
+_ENV_SNAPSHOT: Dict[str, Any] = {var: os.environ.get(var) for var in _ENV_VARS}
+
+def refresh_env_snapshot():
+    """Re-read the environment variables captured at import time"""
+    global MOCK_MODE
+    _ENV_SNAPSHOT.update({var: os.environ.get(var) for var in _ENV_VARS})
+    MOCK_MODE = (_ENV_SNAPSHOT["MOCK_RESPONSES"] or 'false').lower() in ('true', '1', 'yes')
+
 # Check for mock mode
-MOCK_MODE = os.getenv('MOCK_RESPONSES', 'false').lower() in ('true', '1', 'yes')
+MOCK_MODE = (_ENV_SNAPSHOT["MOCK_RESPONSES"] or 'false').lower() in ('true', '1', 'yes')
+
+# Conversation directories with more files than this are cleaned up by a thread pool
+_PARALLEL_CLEANUP_THRESHOLD = 4096
+
+# Markdown export heading per message role
+_ROLE_HEADER = {"user": "## 👤 User", "assistant": "## 🤖 Coach"}
+_DEFAULT_ROLE_HEADER = "## 🔧 System"
+
+# Parsed YAML files keyed by absolute path, stored with the (mtime_ns, size) they were parsed at
+_YAML_CACHE: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+
+@functools.lru_cache(maxsize=None)
+def _import_yaml():
+    """
+    Import PyYAML on first use, preferring the libyaml-backed loader and dumper
+    
+    Returns:
+        Tuple of (yaml module, Loader class, Dumper class)
+    """
+    import yaml
+    try:
+        from yaml import CSafeLoader as Loader, CSafeDumper as Dumper
+    except ImportError:  # PyYAML built without libyaml
+        from yaml import SafeLoader as Loader, SafeDumper as Dumper
+    return yaml, Loader, Dumper
+
+def clear_yaml_cache():
+    """Drop all cached YAML files"""
+    _YAML_CACHE.clear()
 
 def load_yaml(file_path: str) -> Dict[str, Any]:
     """
     Load and parse a YAML configuration file
     
+    Parsed files are cached and only re-parsed when their mtime or size changes.
+    
     Args:
         file_path: Path to YAML file
         
@@ -32,26 +84,79 @@ def load_yaml(file_path: str) -> Dict[str, Any]:
         FileNotFoundError: If file doesn't exist
         yaml.YAMLError: If file is invalid YAML
     """
+    yaml, Loader, _ = _import_yaml()
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
-        return data or {}
+        abs_path = os.path.abspath(file_path)
+        st = os.stat(abs_path)
+        cached = _YAML_CACHE.get(abs_path)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            # Callers may mutate the result (e.g. config_tool set), so hand out a copy
+            return copy.deepcopy(cached[2])
+        
+        # Hand the parser a single bytes buffer rather than a text stream it reads piecewise
+        with open(abs_path, 'rb') as f:
+            data = yaml.load(f.read(), Loader=Loader) or {}
+        _YAML_CACHE[abs_path] = (st.st_mtime_ns, st.st_size, data)
+        return copy.deepcopy(data)
     except FileNotFoundError:
         raise FileNotFoundError(f"Configuration file not found: {file_path}")
     except yaml.YAMLError as e:
         raise yaml.YAMLError(f"Invalid YAML in {file_path}: {e}")
 
+def dump_yaml(data: Any, stream=None, **kwargs):
+    """
+    Serialize data to YAML
+    
+    Args:
+        data: Data to serialize
+        stream: Optional file object to write to
+        **kwargs: Extra options passed to yaml.dump
+        
+    Returns:
+        YAML string if no stream is given, otherwise None
+    """
+    yaml, _, Dumper = _import_yaml()
+    return yaml.dump(data, stream, Dumper=Dumper, **kwargs)
+
+@contextlib.contextmanager
+def atomic_write(file_path: str, binary: bool = False):
+    """
+    Open a temporary file that replaces file_path only once writing has succeeded
+    
+    Args:
+        file_path: Final path of the file
+        binary: Open the temporary file in binary instead of UTF-8 text mode
+        
+    Yields:
+        File object to write to
+    """
+    parent = os.path.dirname(file_path) or "."
+    if not os.path.isdir(parent):
+        os.makedirs(parent, exist_ok=True)
+    tmp_path = f"{file_path}.tmp.{os.getpid()}"
+    try:
+        with (open(tmp_path, 'wb') if binary else open(tmp_path, 'w', encoding='utf-8')) as f:
+            yield f
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp_path)
+        raise
+
 def save_yaml(file_path: str, data: Dict[str, Any]):
     """
     Save data to a YAML file
     
+    The file is written to a temporary path and moved into place, so readers
+    never see a partially written config.
+    
     Args:
         file_path: Path to save YAML file
         data: Dictionary to save
     """
-    Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        yaml.safe_dump(data, f, default_flow_style=False, allow_unicode=True)
+    _YAML_CACHE.pop(os.path.abspath(file_path), None)
+    with atomic_write(file_path) as f:
+        dump_yaml(data, f, default_flow_style=False, allow_unicode=True)
 
 def load_json(file_path: str) -> Dict[str, Any]:
     """
@@ -64,15 +169,75 @@ def load_json(file_path: str) -> Dict[str, Any]:
         Dictionary with data
     """
     try:
+        if orjson is not None:
+            # orjson parses the raw bytes directly, skipping text-mode decoding
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            try:
+                data = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                pass  # may be NaN/Infinity, which only the stdlib parser accepts
+            else:
+                if not _any_float(data, _is_beyond_int64):
+                    return data
+            # Re-parse what save_json wrote with the stdlib encoder (see _encode_json)
+            return json.loads(raw.decode('utf-8'))
         with open(file_path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except FileNotFoundError:
         return {}
-    except json.JSONDecodeError as e:
+    except json.JSONDecodeError as e:  # orjson.JSONDecodeError is a subclass
         logging.error(f"Invalid JSON in {file_path}: {e}")
         return {}
 
-def save_json(file_path: str, data: Any, indent: int = 2):
+def _any_float(data: Any, predicate: Callable[[float], bool]) -> bool:
+    """Check whether data contains a float matching predicate anywhere"""
+    if isinstance(data, float):
+        return predicate(data)
+    if isinstance(data, dict):
+        return any(_any_float(value, predicate) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(_any_float(value, predicate) for value in data)
+    return False
+
+def _is_non_finite(value: float) -> bool:
+    return not math.isfinite(value)
+
+def _is_beyond_int64(value: float) -> bool:
+    # orjson reads integers wider than 64 bits as floats, losing precision
+    return abs(value) >= 2 ** 63
+
+def _encode_json(data: Any, indent: int = 2) -> bytes:
+    """
+    Serialize data to UTF-8 encoded JSON
+    
+    Uses orjson when installed (for indent 2 or None), which serializes
+    straight to bytes without building an intermediate str. Data orjson
+    rejects (e.g. integers beyond 64 bits) or would change (NaN/Infinity)
+    goes through the stdlib json module instead.
+    
+    Args:
+        data: Data to serialize
+        indent: JSON indentation, or None for compact output
+        
+    Returns:
+        Encoded JSON document
+    """
+    if orjson is not None and indent in (2, None):
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            encoded = orjson.dumps(data, option=option, default=str)
+        except TypeError:
+            encoded = None
+        # orjson writes NaN/Infinity as null - only the stdlib encoder round-trips them
+        if encoded is not None and not (b"null" in encoded and _any_float(data, _is_non_finite)):
+            return encoded
+    if indent is None:
+        # json.dumps uses the C encoder when there is no indent
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode('utf-8')
+    return json.dumps(data, indent=indent, ensure_ascii=False, default=str).encode('utf-8')
+
+def save_json(file_path: str, data: Any, indent: int = 2, pretty: bool = True):
     """
     Save data to a JSON file
     
@@ -80,10 +245,48 @@ def save_json(file_path: str, data: Any, indent: int = 2):
         file_path: Path to save JSON file
         data: Data to save
         indent: JSON indentation
+        pretty: Set to False for compact machine-read output (ignores indent)
+    """
+    with atomic_write(file_path, binary=True) as f:
+        f.write(_encode_json(data, indent if pretty else None))
+
+def append_jsonl(file_path: str, records: List[Any]):
+    """
+    Append records to a JSON Lines file, one JSON document per line
+    
+    Args:
+        file_path: Path to JSONL file
+        records: Records to append
     """
     Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=indent, ensure_ascii=False, default=str)
+    with open(file_path, 'a', encoding='utf-8') as f:
+        f.write("".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records))
+
+def load_jsonl(file_path: str) -> List[Any]:
+    """
+    Load a JSON Lines file line by line
+    
+    Lines that are not valid JSON (e.g. a final line cut short by a crash) are skipped.
+    
+    Args:
+        file_path: Path to JSONL file
+        
+    Returns:
+        List of records, empty if the file does not exist
+    """
+    records = []
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    logging.error("Invalid JSON on line %d of %s: %s", line_number, file_path, e)
+    except FileNotFoundError:
+        pass
+    return records
 
 def setup_logging(level: str = "INFO", log_file: str = None):
     """
@@ -103,7 +306,11 @@ def setup_logging(level: str = "INFO", log_file: str = None):
     # Setup handlers
     handlers = [logging.StreamHandler()]
     if log_file:
-        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+        # Buffer file records and write them in batches (immediately for errors)
+        file_handler = logging.FileHandler(log_file, encoding='utf-8', delay=True)
+        # basicConfig only formats the handlers it is given, i.e. the MemoryHandler
+        file_handler.setFormatter(logging.Formatter(log_format))
+        handlers.append(logging.handlers.MemoryHandler(capacity=256, flushLevel=logging.ERROR, target=file_handler))
     
     # Configure logging
     logging.basicConfig(
@@ -116,6 +323,37 @@ def setup_logging(level: str = "INFO", log_file: str = None):
     # Reduce openai library logging
     logging.getLogger("openai").setLevel(logging.WARNING)
     logging.getLogger("httpx").setLevel(logging.WARNING)
+    
+    # The log format uses no thread/process fields, so skip collecting them per record
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+@functools.lru_cache(maxsize=None)
+def _find_missing_files(file_paths: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Find which of the given files do not exist, listing each parent directory only once
+    
+    Args:
+        file_paths: Paths of the files to check
+        
+    Returns:
+        Missing file paths in their original order
+    """
+    paths_by_dir: Dict[str, List[str]] = {}
+    for file_path in file_paths:
+        paths_by_dir.setdefault(os.path.dirname(file_path) or ".", []).append(file_path)
+    
+    missing = set()
+    for directory, paths in paths_by_dir.items():
+        try:
+            with os.scandir(directory) as it:
+                entries = {entry.name for entry in it}
+        except (FileNotFoundError, NotADirectoryError):
+            entries = set()
+        missing.update(path for path in paths if os.path.basename(path) not in entries)
+    
+    return tuple(path for path in file_paths if path in missing)
 
 def validate_environment() -> Dict[str, Any]:
     """
@@ -124,8 +362,6 @@ def validate_environment() -> Dict[str, Any]:
     Returns:
         Dictionary with validation results
     """
-    import os
-    
     validation = {
         "valid": True,
         "errors": [],
@@ -140,7 +376,7 @@ def validate_environment() -> Dict[str, Any]:
     ]
     
     for var in required_env_vars:
-        if not os.getenv(var):
+        if not _ENV_SNAPSHOT.get(var):
             validation["errors"].append(f"Missing environment variable: {var}")
             validation["valid"] = False
     
@@ -151,9 +387,8 @@ def validate_environment() -> Dict[str, Any]:
         "backend/config/prompts/examples.md"
     ]
     
-    for file_path in config_files:
-        if not Path(file_path).exists():
-            validation["warnings"].append(f"Configuration file not found: {file_path}")
+    for file_path in _find_missing_files(tuple(config_files)):
+        validation["warnings"].append(f"Configuration file not found: {file_path}")
     
     return validation
 
@@ -167,30 +402,37 @@ def format_conversation_for_export(messages: List[Dict]) -> str:
     Returns:
         Formatted conversation as string
     """
-    formatted = []
-    formatted.append(f"# Design Thinking Coach Conversation")
-    formatted.append(f"Exported: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    formatted.append("")
+    buf = io.StringIO()
+    write = buf.write
+    write(f"# Design Thinking Coach Conversation\nExported: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
     
     for msg in messages:
-        role = msg.get("role", "unknown")
-        content = msg.get("content", "")
+        header = _ROLE_HEADER.get(msg.get("role"), _DEFAULT_ROLE_HEADER)
         timestamp = msg.get("timestamp", "")
-        
-        if role == "user":
-            formatted.append(f"## 👤 User ({timestamp})")
-        elif role == "assistant":
-            formatted.append(f"## 🤖 Coach ({timestamp})")
-        else:
-            formatted.append(f"## 🔧 System ({timestamp})")
-        
-        formatted.append("")
-        formatted.append(content)
-        formatted.append("")
-        formatted.append("---")
-        formatted.append("")
+        if isinstance(timestamp, (int, float)) and not isinstance(timestamp, bool):
+            # Epoch timestamps are formatted without going through datetime
+            timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+        write(f"\n{header} ({timestamp})\n\n{msg.get('content', '')}\n\n---\n")
     
-    return "\n".join(formatted)
+    return buf.getvalue()
+
+def _delete_files_older_than(entries: List[os.DirEntry], cutoff_time: float) -> int:
+    """
+    Delete the files whose modification time is before cutoff_time
+    
+    Args:
+        entries: Directory entries of the candidate files
+        cutoff_time: Epoch time before which files are deleted
+        
+    Returns:
+        Number of deleted files
+    """
+    deleted_count = 0
+    for entry in entries:
+        if entry.stat(follow_symlinks=False).st_mtime < cutoff_time:
+            os.unlink(entry.path)
+            deleted_count += 1
+    return deleted_count
 
 def clean_old_conversations(conversations_dir: str = "conversations", days_to_keep: int = 30):
     """
@@ -200,19 +442,25 @@ def clean_old_conversations(conversations_dir: str = "conversations", days_to_ke
         conversations_dir: Directory containing conversation files
         days_to_keep: Number of days to keep conversations
     """
-    import time
+    cutoff_time = time.time() - (days_to_keep * 24 * 60 * 60)
     
-    conversations_path = Path(conversations_dir)
-    if not conversations_path.exists():
+    try:
+        with os.scandir(conversations_dir) as it:
+            entries = [
+                entry for entry in it
+                if entry.name.endswith((".json", ".jsonl")) and entry.is_file(follow_symlinks=False)
+            ]
+    except FileNotFoundError:
         return
     
-    cutoff_time = time.time() - (days_to_keep * 24 * 60 * 60)
-    
-    deleted_count = 0
-    for file_path in conversations_path.glob("*.json"):
-        if file_path.stat().st_mtime < cutoff_time:
-            file_path.unlink()
-            deleted_count += 1
+    if len(entries) > _PARALLEL_CLEANUP_THRESHOLD:
+        # stat/unlink release the GIL, so threads can work through shards in parallel
+        workers = min(8, os.cpu_count() or 1)
+        shards = [entries[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            deleted_count = sum(executor.map(_delete_files_older_than, shards, [cutoff_time] * workers))
+    else:
+        deleted_count = _delete_files_older_than(entries, cutoff_time)
     
     if deleted_count > 0:
         logging.info(f"Cleaned up {deleted_count} old conversation files")
\ No newline at end of file
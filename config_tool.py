@@ -6,18 +6,24 @@ CLI tool to view, edit, and manage the master configuration
 
 import sys
 import os
+import ast
 import argparse
-import yaml
+import shlex
+import subprocess
 from pathlib import Path
 
 # Add project root to path
 project_root = Path(__file__).parent.absolute()
 sys.path.append(str(project_root))
 
-from chatbot.utils import load_yaml, save_yaml
+# chatbot.utils (PyYAML, dotenv) is imported inside the commands that need it
+# so that e.g. `help` starts without loading them
 
 CONFIG_PATH = "config/master_config.yaml"
 
+# Value types `set` may write to the configuration
+YAML_VALUE_TYPES = (int, float, bool, type(None), str, list, dict)
+
 def print_help():
     """Print help message"""
     print("\nDesign Thinking Coach Configuration Manager")
@@ -41,8 +47,10 @@ def view_config():
         print(f"Error: Configuration file not found at {CONFIG_PATH}")
         return
     
+    from chatbot.utils import load_yaml, dump_yaml
+    
     config = load_yaml(CONFIG_PATH)
-    print(yaml.dump(config, default_flow_style=False, sort_keys=False))
+    print(dump_yaml(config, default_flow_style=False, sort_keys=False))
 
 def edit_config():
     """Open the configuration file in the default editor"""
@@ -50,12 +58,21 @@ def edit_config():
         print(f"Error: Configuration file not found at {CONFIG_PATH}")
         return
     
-    # Determine the editor to use
-    editor = os.environ.get('EDITOR', 'nano')
+    # Determine the editor to use ($EDITOR may carry arguments, e.g. "code --wait")
+    editor = os.environ.get('EDITOR', '')
+    command = shlex.split(editor) or ['nano']
     
-    # Open the configuration file in the editor
-    os.system(f"{editor} {CONFIG_PATH}")
-    print(f"Configuration file opened in {editor}. Changes saved.")
+    # Open the configuration file in the editor (no shell)
+    try:
+        result = subprocess.run(command + [CONFIG_PATH], check=False)
+    except (FileNotFoundError, PermissionError) as e:
+        print(f"Error: Could not start editor '{command[0]}': {e}")
+        return
+    
+    if result.returncode == 0:
+        print(f"Configuration file opened in {command[0]}. Changes saved.")
+    else:
+        print(f"Error: Editor '{command[0]}' exited with status {result.returncode}")
 
 def set_config_value(key_path, value):
     """Set a configuration value at the specified key path"""
@@ -63,7 +80,23 @@ def set_config_value(key_path, value):
         print(f"Error: Configuration file not found at {CONFIG_PATH}")
         return
     
-    config = load_yaml(CONFIG_PATH)
+    from chatbot.utils import atomic_write, load_yaml, save_yaml
+    
+    try:
+        from ruamel.yaml import YAML
+    except ImportError:  # optional - fall back to a plain load/dump, which drops comments
+        YAML = None
+    
+    if YAML is not None:
+        # Round-trip mode only re-emits what changed and keeps comments, order and quoting
+        yaml_rt = YAML(typ='rt')
+        yaml_rt.preserve_quotes = True
+        yaml_rt.width = 4096
+        yaml_rt.indent(mapping=2, sequence=4, offset=2)
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+            config = yaml_rt.load(f)
+    else:
+        config = load_yaml(CONFIG_PATH)
     
     # Parse the key path
     keys = key_path.split('.')
@@ -78,20 +111,31 @@ def set_config_value(key_path, value):
     
     # Set the value
     try:
-        # Attempt to convert the value to the appropriate type
-        if value.lower() == "true":
+        # Attempt to convert the value to the appropriate type (YAML-style booleans first,
+        # then Python literals such as -1, 1e-3 or [1, 2]; anything else stays a string)
+        lowered = value.lower()
+        if lowered == "true":
             parsed_value = True
-        elif value.lower() == "false":
+        elif lowered == "false":
             parsed_value = False
-        elif value.isdigit():
+        elif value.isdecimal():
+            # Also covers zero-padded numbers such as 0777, which literal_eval rejects
             parsed_value = int(value)
-        elif value.replace('.', '', 1).isdigit() and value.count('.') < 2:
-            parsed_value = float(value)
         else:
-            parsed_value = value
+            try:
+                parsed_value = ast.literal_eval(value)
+            except (ValueError, SyntaxError):
+                parsed_value = value
+            # Only keep types the YAML dumper can write (not e.g. complex numbers, tuples or sets)
+            if not isinstance(parsed_value, YAML_VALUE_TYPES):
+                parsed_value = value
         
         current[keys[-1]] = parsed_value
-        save_yaml(CONFIG_PATH, config)
+        if YAML is not None:
+            with atomic_write(CONFIG_PATH) as f:
+                yaml_rt.dump(config, f)
+        else:
+            save_yaml(CONFIG_PATH, config)
         print(f"Configuration updated: {key_path} = {parsed_value}")
     except Exception as e:
         print(f"Error setting configuration value: {e}")
@@ -103,6 +147,8 @@ def reset_config():
     
     # Check if a default configuration exists
     if os.path.exists(default_config_path):
+        from chatbot.utils import load_yaml, save_yaml
+        
         # Copy the default configuration to the main configuration file
         config = load_yaml(default_config_path)
         save_yaml(CONFIG_PATH, config)